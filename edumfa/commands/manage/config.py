@@ -115,7 +115,7 @@ def importer(infile, types, name=None):
     "--file",
     "-f",
     "file",
-    help="The file to import. It can be a plain python file or a tar.gz archive containing a configuration backup file with a name containing 'edumfa-config-backup'.",
+    help="The file to import. It can be a plain JSON or python file or a tar.gz archive containing a configuration backup file with a name containing 'edumfa-config-backup'.",
 )
 @click.option(
     "--update",
@@ -182,7 +182,7 @@ def export_full_config(passwords, archive, directory):
         else:
             call(["mkdir", "-p", directory])
         config_backup_file_base = f"{directory}/{BASE_NAME}-{HOSTNAME}-{DATE}"
-        config_backup_file = f"{config_backup_file_base}.py"
+        config_backup_file = f"{config_backup_file_base}.json"
 
         conf_export(data, filename=config_backup_file)
         if archive:
@@ -18,15 +18,95 @@
 # License along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 import ast
+import json
 import sys
+from collections import Counter
+from contextlib import contextmanager
 
 import click
-from edumfa.lib.policy import set_policy, delete_policy, PolicyClass
+from sqlalchemy.exc import SQLAlchemyError
+from edumfa.lib.policy import set_policy, delete_policy, delete_all_policies, PolicyClass
 
-from edumfa.lib.event import set_event, delete_event
+from edumfa.lib.event import set_event, delete_event, delete_all_events
 from edumfa.lib.resolver import get_resolver_list, save_resolver
+from edumfa.models import db
 
 DEFAULT_CONFTYPE_LIST = ("policy", "resolver", "event")
+DEFAULT_BATCH_SIZE = 1000
+# Use a large buffer for reading and writing configuration files
+FILE_BUFFER_SIZE = 1 << 20
+# Parameters of set_policy which are taken from an exported policy
+_POLICY_PARAMS = frozenset(("name", "action", "active", "adminrealm", "adminuser", "check_all_resolvers",
+                            "client", "conditions", "edumfanode", "priority", "realm", "resolver", "scope",
+                            "time", "user"))
+_POLICY_DEFAULTS = {"active": True, "check_all_resolvers": False}
+
+
+@contextmanager
+def import_transaction():
+    """
+    Run a configuration import in one database transaction.
+
+    The library functions commit the session after every single change.
+    Within this context these commits only flush the session, and the
+    changes are committed once at the end. If the import fails, everything
+    is rolled back, including a cleanup or purge.
+    """
+    session = db.session
+    commit = session.commit
+    session.commit = session.flush
+    try:
+        yield
+        commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        del session.commit
+
+
+@contextmanager
+def buffered_echo(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Collect the messages of an import and write them to stdout with one
+    ``click.echo`` call for every ``batch_size`` messages. The context
+    yields the function to add a message. Remaining messages are written
+    when the context is left.
+    """
+    lines = []
+
+    def echo(message):
+        lines.append(message)
+        if len(lines) >= batch_size:
+            click.echo("\n".join(lines))
+            lines.clear()
+
+    try:
+        yield echo
+    finally:
+        if lines:
+            click.echo("\n".join(lines))
+
+
+def _summary(conftype, counts):
+    """ summary line of an import from the counted actions """
+    return "Imported {0!s}: {1:d} added, {2:d} updated, {3:d} skipped.".format(
+        conftype, counts["Added"], counts["Updated"], counts["Skipped"])
+
+
+def _parse_config(contents):
+    """
+    Parse the contents of a configuration export.
+
+    Exports are read as JSON. Older versions of edumfa-manage exported the
+    configuration as a python literal, which is still accepted as a fallback.
+    JSON and python literals differ in the notation of strings and constants,
+    so a legacy export fails early in the JSON parser.
+    """
+    try:
+        return json.loads(contents)
+    except ValueError:
+        return ast.literal_eval(contents)
 
 
 def conf_import(filename=None, conftype=None):
@@ -34,13 +114,13 @@ def conf_import(filename=None, conftype=None):
     import eduMFA configuration from file
     """
     if filename:
-        with open(filename, 'r') as f:
+        with open(filename, 'r', buffering=FILE_BUFFER_SIZE) as f:
             contents = f.read()
     else:
         filename = "Standard input"
         contents = sys.stdin.read()
 
-    contents_var = ast.literal_eval(contents)
+    contents_var = _parse_config(contents)
 
     # be backwards-compatible. In old versions of edumfa-manage config were exported to
     # individual files as python list without dict key
@@ -61,16 +141,14 @@ def conf_import(filename=None, conftype=None):
 def conf_export(config, filename=None):
     """
     Export configurations to a file or write them to stdout if no filename is given.
+    The configuration is written as JSON.
     """
-    import pprint
-    pp = pprint.PrettyPrinter(indent=4)
-
-    ret_str = pp.pformat(config)
     if filename:
-        with open(filename, 'w') as f:
-            f.write(ret_str)
-    if not filename:
-        print(ret_str)
+        with open(filename, 'w', buffering=FILE_BUFFER_SIZE) as f:
+            json.dump(config, f, indent=4, default=str)
+    else:
+        json.dump(config, sys.stdout, indent=4, default=str)
+        sys.stdout.write("\n")
 
 
 def get_conf_policy(name=None):
@@ -79,52 +157,56 @@ def get_conf_policy(name=None):
     return pol_cls.list_policies(name=name)
 
 
-def import_conf_policy(config_list, cleanup=False, update=False, purge=False):
+def import_conf_policy(config_list, cleanup=False, update=False, purge=False, batch_size=DEFAULT_BATCH_SIZE):
     """
     import policy configuration from a policy list
     """
+    # Every change of a policy invalidates the config object, so we work
+    # on a snapshot of the stored policy names during the whole import.
+    stored_names = [x.get("name") for x in PolicyClass().list_policies()]
+    existing_names = set(stored_names)
 
-    cls = PolicyClass()
-
-    if cleanup:
-        click.echo("Cleanup old policies.")
-        policies = cls.list_policies()
-        for policy in policies:
-            name = policy.get("name")
-            r = delete_policy(name)
-            click.echo(f"Deleted policy {name!s} with result {r!s}")
-    if purge:
+    counts = Counter()
+    with import_transaction(), buffered_echo(batch_size) as echo:
         if cleanup:
-            click.echo("Cleanup was performed before - nothing to purge here.")
-        else:
-            stored_names = [x.get("name") for x in cls.list_policies()]
-            import_names = [x.get("name") for x in config_list]
-
-            for stored in stored_names:
-                if stored not in import_names:
-                    try:
-                        r = delete_policy(stored)
-                        click.echo(f"Purged policy {stored!s} with result {r!s}")
-                    except Exception as ex:
-                        click.echo(f"Purged policy {stored!s} failed with error {ex}")
-
-    for policy in config_list:
-        action_str = "Added"
-        name = policy.get("name")
-        exists = cls.list_policies(name=name)
-        if exists:
-            if not update:
-                click.echo("Policy {0!s} exists and -u is not specified, skipping import.".format(name))
-                continue
+            click.echo("Cleanup old policies.")
+            r = delete_all_policies()
+            existing_names.clear()
+            click.echo(f"Deleted {r!s} policies")
+        if purge:
+            if cleanup:
+                click.echo("Cleanup was performed before - nothing to purge here.")
             else:
-                action_str = "Updated"
-        r = set_policy(name, action=policy.get("action"), active=policy.get("active", True),
-                       adminrealm=policy.get("adminrealm"), adminuser=policy.get("adminuser"),
-                       check_all_resolvers=policy.get("check_all_resolvers", False), client=policy.get("client"),
-                       conditions=policy.get("conditions"), edumfanode=policy.get("edumfanode"),
-                       priority=policy.get("priority"), realm=policy.get("realm"), resolver=policy.get("resolver"),
-                       scope=policy.get("scope"), time=policy.get("time"), user=policy.get("user"))
-        click.echo("{0!s} policy {1!s} with result {2!s}".format(action_str, name, r))
+                import_names = {x.get("name") for x in config_list}
+
+                for stored in stored_names:
+                    if stored not in import_names:
+                        try:
+                            r = delete_policy(stored)
+                            existing_names.discard(stored)
+                            echo(f"Purged policy {stored!s} with result {r!s}")
+                        except SQLAlchemyError:
+                            # The session of the import can not be used after a database error
+                            raise
+                        except Exception as ex:
+                            echo(f"Purged policy {stored!s} failed with error {ex}")
+
+        for policy in config_list:
+            action_str = "Added"
+            name = policy.get("name")
+            if name and name in existing_names:
+                if not update:
+                    echo("Policy {0!s} exists and -u is not specified, skipping import.".format(name))
+                    counts["Skipped"] += 1
+                    continue
+                else:
+                    action_str = "Updated"
+            params = {k: v for k, v in policy.items() if k in _POLICY_PARAMS}
+            r = set_policy(**{**_POLICY_DEFAULTS, **params})
+            existing_names.add(name)
+            counts[action_str] += 1
+            echo("{0!s} policy {1!s} with result {2!s}".format(action_str, name, r))
+    click.echo(_summary("policies", counts))
 
 
 # conf export menu
@@ -139,86 +221,101 @@ def get_conf_event(name=None):
     return conf
 
 
-def import_conf_event(config_list, cleanup=False, update=False, purge=False):
+def import_conf_event(config_list, cleanup=False, update=False, purge=False, batch_size=DEFAULT_BATCH_SIZE):
     """
     import event configuration from an event list
     """
     from edumfa.lib.event import EventConfiguration
-    cls = EventConfiguration()
-    if cleanup:
-        click.echo("Cleanup old events.")
-        events = cls.events
-        for event in events:
-            name = event.get("name")
-            r = delete_event(event.get("id"))
-            click.echo("Deleted event '{0!s}' with result {1!s}".format(name, r), file=sys.stderr)
-
-    if purge:
+    # Every change of an event invalidates the config object, so we work
+    # on a snapshot of the stored events during the whole import.
+    stored_events = EventConfiguration().events
+    existing_ids = {}
+    for e in stored_events:
+        existing_ids.setdefault(e.get("name"), e.get("id"))
+
+    counts = Counter()
+    with import_transaction(), buffered_echo(batch_size) as echo:
         if cleanup:
-            click.echo("Cleanup was performed before - nothing to purge here.")
-        else:
-            events = cls.events
-            stored_names = [x.get("name") for x in events]
-            import_names = [x.get("name") for x in config_list]
-
-            for stored in stored_names:
-                if stored not in import_names:
-                    try:
-                        r = delete_event([e for e in cls.events if (stored == e.get("name"))][0].get("id"))
-                        click.echo(f"Purged event {stored!s} with result {r!s}")
-                    except Exception as ex:
-                        click.echo(f"Purged event {stored!s} failed with error {ex}")
-
-    for event in config_list:
-        action_str = "Added"
-        # Todo: This check does not work properly. The event is created nevertheless
-        name = event.get("name")
-        events_with_name = [e for e in cls.events if (name == e.get("name"))]
-        if events_with_name:
-            exists = True
-            event_id = events_with_name[0].get("id")
-        else:
-            exists = False
-            event_id = None
-        if exists:
-            if not update:
-                click.echo("Event {0!s} exists and -u is not specified, skipping import.".format(name))
-                continue
+            click.echo("Cleanup old events.")
+            r = delete_all_events()
+            existing_ids = {}
+            click.echo("Deleted {0!s} events".format(r), file=sys.stderr)
+
+        if purge:
+            if cleanup:
+                click.echo("Cleanup was performed before - nothing to purge here.")
             else:
-                action_str = "Updated"
-        r = set_event(name, event.get("event"), event.get("handlermodule"), event.get("action"),
-                      conditions=event.get("conditions"), ordering=event.get("ordering"), options=event.get("options"),
-                      active=event.get("active"), position=event.get("position", "post"), id=event_id)
-        click.echo("{0!s} event {1!s} with result {2!s}".format(action_str, name, r))
-
-
-def import_conf_resolver(config_list, cleanup=False, update=False, purge=False):
+                import_names = {x.get("name") for x in config_list}
+
+                for stored_event in stored_events:
+                    stored = stored_event.get("name")
+                    if stored not in import_names:
+                        try:
+                            r = delete_event(stored_event.get("id"))
+                            existing_ids.pop(stored, None)
+                            echo(f"Purged event {stored!s} with result {r!s}")
+                        except SQLAlchemyError:
+                            # The session of the import can not be used after a database error
+                            raise
+                        except Exception as ex:
+                            echo(f"Purged event {stored!s} failed with error {ex}")
+
+        for event in config_list:
+            action_str = "Added"
+            # Todo: This check does not work properly. The event is created nevertheless
+            name = event.get("name")
+            event_id = existing_ids.get(name) if name else None
+            if event_id is not None:
+                if not update:
+                    echo("Event {0!s} exists and -u is not specified, skipping import.".format(name))
+                    counts["Skipped"] += 1
+                    continue
+                else:
+                    action_str = "Updated"
+            r = set_event(name, event.get("event"), event.get("handlermodule"), event.get("action"),
+                          conditions=event.get("conditions"), ordering=event.get("ordering"), options=event.get("options"),
+                          active=event.get("active"), position=event.get("position", "post"), id=event_id)
+            existing_ids[name] = r
+            counts[action_str] += 1
+            echo("{0!s} event {1!s} with result {2!s}".format(action_str, name, r))
+    click.echo(_summary("events", counts))
+
+
+def import_conf_resolver(config_list, cleanup=False, update=False, purge=False, batch_size=DEFAULT_BATCH_SIZE):
     """
     import resolver configuration from a resolver list
     """
-    if cleanup or purge:
-        click.echo("No cleanup or purge for resolvers implemented")
-
-    for config in config_list:
-        action_str = "Added"
-
-        name = config.get("resolvername")
-        exists = get_resolver_list(filter_resolver_name=name)
-        if exists:
-            if not update:
-                click.echo("Resolver {0!s} exists and -u is not specified, skipping import.".format(name))
-                continue
-            else:
-                action_str = "Updated"
-
-        resolvertype = config.get("type")
-        data = config.get("data")
-        # now we can create the resolver
-        params = {'resolver': name, 'type': resolvertype}
-        for key in data.keys():
-            params.update({key: data.get(key)})
-        r = save_resolver(params)
-        click.echo("{0!s} resolver {1!s} with result {2!s}".format(action_str, name, r))
+    # resolver names are compared case-insensitively
+    existing_names = {x.lower() for x in get_resolver_list()}
+
+    counts = Counter()
+    with import_transaction(), buffered_echo(batch_size) as echo:
+        if cleanup or purge:
+            click.echo("No cleanup or purge for resolvers implemented")
+
+        for config in config_list:
+            action_str = "Added"
+
+            name = config.get("resolvername")
+            if name and name.lower() in existing_names:
+                if not update:
+                    echo("Resolver {0!s} exists and -u is not specified, skipping import.".format(name))
+                    counts["Skipped"] += 1
+                    continue
+                else:
+                    action_str = "Updated"
+
+            resolvertype = config.get("type")
+            data = config.get("data")
+            # now we can create the resolver
+            params = {'resolver': name, 'type': resolvertype}
+            for key in data.keys():
+                params.update({key: data.get(key)})
+            r = save_resolver(params)
+            existing_names.add(name.lower())
+            counts[action_str] += 1
+            echo("{0!s} resolver {1!s} with result {2!s}".format(action_str, name, r))
+    click.echo(_summary("resolvers", counts))
 
 
 def get_conf_resolver(name=None, print_passwords=False):
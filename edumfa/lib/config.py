@@ -234,6 +234,21 @@ class LocalConfigClass(object):
         default_true_keys = [SYSCONF.PREPENDPIN, SYSCONF.SPLITATSIGN,
                              SYSCONF.INCFAILCOUNTER, SYSCONF.RETURNSAML]
 
+        if key:
+            # We only need to look at a single key and do not build the
+            # whole (decrypted) configuration
+            cvalue = self.config.get(key)
+            if cvalue is not None and (role == "admin" or cvalue.get("Type") == "public"):
+                if cvalue.get("Type") == "password":
+                    r_config = decryptPassword(cvalue.get("Value"))
+                else:
+                    r_config = cvalue.get("Value")
+            elif key in default_true_keys:
+                r_config = "True"
+            else:
+                r_config = default
+            return self._to_bool(r_config) if return_bool else r_config
+
         r_config = {}
 
         # reduce the dictionary to only public keys!
@@ -255,20 +270,21 @@ class LocalConfigClass(object):
             if t_key not in r_config:
                 r_config[t_key] = "True"
 
-        if key:
-            # We only return a single key
-            r_config = r_config.get(key, default)
-
         if return_bool:
-            if isinstance(r_config, bool):
-                pass
-            if isinstance(r_config, int):
-                r_config = r_config > 0
-            if isinstance(r_config, str):
-                r_config = is_true(r_config.lower())
+            r_config = self._to_bool(r_config)
 
         return r_config
 
+    @staticmethod
+    def _to_bool(value):
+        if isinstance(value, bool):
+            pass
+        if isinstance(value, int):
+            value = value > 0
+        if isinstance(value, str):
+            value = is_true(value.lower())
+        return value
+
 
 class SYSCONF(object):
     __doc__ = """This is a list of system config attributes"""
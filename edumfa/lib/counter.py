@@ -32,12 +32,13 @@ from edumfa.lib.config import get_edumfa_node
 from edumfa.models import EventCounter, db
 
 
-def increase(counter_name):
+def increase(counter_name, value=1):
     """
     Increase the counter value in the database.
     If the counter does not exist yet, create the counter.
 
     :param counter_name: The name/identifier of the counter
+    :param value: The amount to increase the counter by
     :return: None
     """
     # If there is no table row for the current node, create one.
@@ -46,7 +47,7 @@ def increase(counter_name):
     if not counter:
         counter = EventCounter(counter_name, 0, node=node)
         counter.save()
-    counter.increase()
+    counter.increase(value)
 
 
 def _reset_counter_on_all_nodes(counter_name):
@@ -59,7 +60,7 @@ def _reset_counter_on_all_nodes(counter_name):
     db.session.commit()
 
 
-def decrease(counter_name, allow_negative=False):
+def decrease(counter_name, allow_negative=False, value=1):
     """
     Decrease the counter value in the database.
     If the counter does not exist yet, create the counter.
@@ -68,6 +69,7 @@ def decrease(counter_name, allow_negative=False):
     :param counter_name: The name/identifier of the counter
     :param allow_negative: Whether the counter can become negative. Note that even if this flag is not set,
                            the counter may become negative due to concurrent queries.
+    :param value: The amount to decrease the counter by
     :return: None
     """
     node = get_edumfa_node()
@@ -79,7 +81,7 @@ def decrease(counter_name, allow_negative=False):
     # counter value is positive (because individual rows may be negative then),
     # or if we allow negative values. Otherwise, we need to reset all rows of all nodes.
     if read(counter_name) > 0 or allow_negative:
-        counter.decrease()
+        counter.decrease(value)
     else:
         _reset_counter_on_all_nodes(counter_name)
 
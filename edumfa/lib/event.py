@@ -24,7 +24,8 @@
 #
 from edumfa.lib.config import get_config_object
 from edumfa.lib.utils import fetch_one_resource
-from edumfa.models import EventHandler, EventHandlerOption, db
+from edumfa.models import (EventHandler, EventHandlerOption, EventHandlerCondition, db,
+                           save_config_timestamp)
 from edumfa.lib.audit import getAudit
 from edumfa.lib.utils.export import (register_import, register_export)
 import functools
@@ -257,6 +258,22 @@ def delete_event(event_id):
     return fetch_one_resource(EventHandler, id=event_id).delete()
 
 
+def delete_all_events():
+    """
+    Delete all event configurations along with their options and conditions
+    with one statement each.
+
+    :return: the number of deleted events
+    :rtype: int
+    """
+    EventHandlerOption.query.delete()
+    EventHandlerCondition.query.delete()
+    ret = EventHandler.query.delete()
+    save_config_timestamp()
+    db.session.commit()
+    return ret
+
+
 class EventConfiguration(object):
     """
     This class is supposed to contain the event handling configuration during
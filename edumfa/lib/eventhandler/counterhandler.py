@@ -28,15 +28,137 @@ increasing/decreasing/resetting database counters.
 These counters can be used by rrdtool to monitor values and print time series of
 certain parameters.
 """
+from flask import current_app
+from flask_babel import get_locale
 from edumfa.lib.eventhandler.base import BaseEventHandler
 from edumfa.lib import _
 from edumfa.lib.counter import increase, decrease, reset
 import logging
 from edumfa.lib.utils import is_true
+import atexit
+import threading
+import time
 import traceback
+from collections import Counter
 
 log = logging.getLogger(__name__)
 
+# Counter changes of handler definitions with the option "coalesce_ms",
+# which are not yet written to the database.
+_pending_changes = Counter()
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+# Whether the collected changes are written when the process exits
+_exit_flush_registered = False
+
+# The translated action definitions per language
+_actions_cache = {}
+
+
+def _flush_pending_changes(counter_name=None):
+    """
+    Write the collected counter changes to the database.
+
+    :param counter_name: Only write the changes of this counter. If no
+        counter name is given, the changes of all counters are written.
+    """
+    global _last_flush
+    with _pending_lock:
+        if counter_name is None:
+            changes = dict(_pending_changes)
+            _pending_changes.clear()
+            _last_flush = time.monotonic()
+        else:
+            changes = {counter_name: _pending_changes.pop(counter_name, 0)}
+    for name, value in changes.items():
+        if value > 0:
+            increase(name, value)
+        elif value < 0:
+            decrease(name, allow_negative=True, value=-value)
+
+
+def _flush_at_exit(app):
+    """
+    Write the collected counter changes, when the process exits.
+    """
+    if not _pending_changes:
+        return
+    try:
+        with app.app_context():
+            _flush_pending_changes()
+    except Exception as exx:  # pragma: no cover
+        log.warning("Could not write the collected counter changes: {0!s}".format(exx))
+        log.debug("{0!s}".format(traceback.format_exc()))
+
+
+def _coalesce_change(counter_name, value, coalesce_ms):
+    """
+    Collect a counter change in memory. All collected changes are written
+    to the database, if the last write is more than ``coalesce_ms``
+    milliseconds ago, and when the process exits.
+    """
+    global _exit_flush_registered
+    with _pending_lock:
+        if not _exit_flush_registered:
+            atexit.register(_flush_at_exit, current_app._get_current_object())
+            _exit_flush_registered = True
+        _pending_changes[counter_name] += value
+        flush = (time.monotonic() - _last_flush) * 1000 >= coalesce_ms
+    if flush:
+        _flush_pending_changes()
+
+
+def _get_coalesce_ms(handler_options):
+    coalesce_ms = handler_options.get("coalesce_ms")
+    if not coalesce_ms:
+        return 0
+    try:
+        return int(coalesce_ms)
+    except (TypeError, ValueError):
+        log.warning("Invalid value {0!r} for the option coalesce_ms. "
+                    "The counter changes are written immediately.".format(coalesce_ms))
+        return 0
+
+
+def _increase_counter(counter_name, handler_options):
+    coalesce_ms = _get_coalesce_ms(handler_options)
+    if coalesce_ms > 0:
+        _coalesce_change(counter_name, 1, coalesce_ms)
+    else:
+        increase(counter_name)
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Increased the counter {0!s}.".format(counter_name))
+
+
+def _decrease_counter(counter_name, handler_options):
+    # Most definitions do not set the option, which saves the check of the value
+    allow_negative = ("allow_negative_values" in handler_options
+                      and is_true(handler_options["allow_negative_values"]))
+    coalesce_ms = _get_coalesce_ms(handler_options)
+    if coalesce_ms > 0 and allow_negative:
+        _coalesce_change(counter_name, -1, coalesce_ms)
+    else:
+        # The check for negative values requires the current value
+        _flush_pending_changes(counter_name)
+        decrease(counter_name, allow_negative)
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Decreased the counter {0!s}.".format(counter_name))
+
+
+def _reset_counter(counter_name, handler_options):
+    # Changes collected before the reset are obsolete
+    with _pending_lock:
+        _pending_changes.pop(counter_name, None)
+    reset(counter_name)
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Reset the counter {0!s} to 0.".format(counter_name))
+
+
+# The functions performing the actions of the handler
+_ACTION_FUNCTIONS = {"increase_counter": _increase_counter,
+                     "decrease_counter": _decrease_counter,
+                     "reset_counter": _reset_counter}
+
 
 class CounterEventHandler(BaseEventHandler):
     """
@@ -61,13 +183,23 @@ class CounterEventHandler(BaseEventHandler):
         """
         This method returns a dictionary of allowed actions and possible
         options in this handler module.
+        The dictionary is only built once for every language.
 
         :return: dict with actions
         """
+        language = str(get_locale())
+        actions = _actions_cache.get(language)
+        if actions is not None:
+            return actions
         actions = {"increase_counter": {
             "counter_name": {
                 "type": "str",
-                "description": _("The identifier/key of the counter.")}
+                "description": _("The identifier/key of the counter.")},
+            "coalesce_ms": {
+                "type": "int",
+                "description": _("Collect the counter changes in memory and write them to the "
+                                 "database with the next event after this number of milliseconds "
+                                 "or when the process exits. 0 writes every change immediately.")}
             },
             "decrease_counter": {
                 "counter_name": {
@@ -75,13 +207,20 @@ class CounterEventHandler(BaseEventHandler):
                     "description": _("The identifier/key of the counter.")},
                 'allow_negative_values': {
                     "type": "bool",
-                    "description": _("Don't stop counter if it reaches zero.")}
+                    "description": _("Don't stop counter if it reaches zero.")},
+                "coalesce_ms": {
+                    "type": "int",
+                    "description": _("Collect the counter changes in memory and write them to the "
+                                     "database with the next event after this number of milliseconds "
+                                     "or when the process exits. 0 writes every change immediately. "
+                                     "Only used if negative values are allowed.")}
             },
             "reset_counter": {
                 "counter_name": {
                     "type": "str",
                     "description": _("The identifier/key of the counter.")}
         }}
+        _actions_cache[language] = actions
         return actions
 
     def do(self, action, options=None):
@@ -96,19 +235,9 @@ class CounterEventHandler(BaseEventHandler):
         """
         ret = True
         #g = options.get("g")
-        handler_def = options.get("handler_def")
-        handler_options = handler_def.get("options", {})
-        counter_name = handler_options.get("counter_name")
-
-        if action == "increase_counter":
-            increase(counter_name)
-            log.debug("Increased the counter {0!s}.".format(counter_name))
-        elif action == "decrease_counter":
-            allow_negative = is_true(handler_options.get("allow_negative_values", False))
-            decrease(counter_name, allow_negative)
-            log.debug("Decreased the counter {0!s}.".format(counter_name))
-        elif action == "reset_counter":
-            reset(counter_name)
-            log.debug("Reset the counter {0!s} to 0.".format(counter_name))
+        handler_options = options["handler_def"].get("options", {})
+        action_function = _ACTION_FUNCTIONS.get(action)
+        if action_function:
+            action_function(handler_options.get("counter_name"), handler_options)
 
         return ret
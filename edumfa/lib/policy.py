@@ -96,7 +96,7 @@ from configobj import ConfigObj
 
 from operator import itemgetter
 import logging
-from ..models import (Policy, db, save_config_timestamp, Token)
+from ..models import (Policy, PolicyCondition, db, save_config_timestamp, Token)
 from edumfa.lib.config import (get_token_classes, get_token_types,
                                     get_config_object, get_edumfa_node,
                                     get_multichallenge_enrollable_tokentypes)
@@ -1376,9 +1376,17 @@ def delete_policy(name):
 
 @log_with(log)
 def delete_all_policies():
-    policies = Policy.query.all()
-    for p in policies:
-        p.delete()
+    """
+    Delete all policies and their conditions with one statement each.
+
+    :return: the number of deleted policies
+    :rtype: int
+    """
+    PolicyCondition.query.delete()
+    ret = Policy.query.delete()
+    save_config_timestamp()
+    db.session.commit()
+    return ret
 
 
 @log_with(log)
@@ -39,10 +39,18 @@ from ..models import (Realm,
 from .log import log_with
 from edumfa.lib.config import get_config_object
 import logging
+from operator import itemgetter
 from edumfa.lib.utils import sanity_name_check, fetch_one_resource, is_true
 from edumfa.lib.utils.export import (register_import, register_export)
 log = logging.getLogger(__name__)
 
+# The realm configuration and the realms of every resolver built from it
+_resolver_realms_index = (None, {})
+# The realm configuration and the ordered resolvers of the realms built from it
+_ordered_resolvers_index = (None, {})
+# The realm configuration and the set of realm names built from it
+_realm_names_index = (None, frozenset())
+
 
 @log_with(log)
 #@cache.memoize(10)
@@ -79,6 +87,75 @@ def get_realm(realmname):
     return r or {}
 
 
+def get_realm_names():
+    """
+    Return the (lowercase) names of all defined realms.
+    The set is only built once for every realm configuration.
+
+    :return: set of realm names
+    :rtype: frozenset
+    """
+    global _realm_names_index
+    realms = get_config_object().realm
+    indexed_realms, names = _realm_names_index
+    if indexed_realms is not realms:
+        # The configuration has been reloaded
+        names = frozenset(realm_name.lower() for realm_name in realms)
+        _realm_names_index = (realms, names)
+    return names
+
+
+def get_resolver_realms():
+    """
+    Return the realms, which contain a resolver, for all resolvers.
+    The result is only built once for every realm configuration and must not
+    be modified.
+
+    :return: dict with the resolver names as keys and the lists of the
+        (lowercase) realm names as values
+    :rtype: dict
+    """
+    global _resolver_realms_index
+    realms = get_config_object().realm
+    indexed_realms, index = _resolver_realms_index
+    if indexed_realms is not realms:
+        # The configuration has been reloaded
+        index = {}
+        for realm_name, realm in realms.items():
+            for reso in realm.get("resolver", []):
+                index.setdefault(reso.get("name"), []).append(realm_name.lower())
+        _resolver_realms_index = (realms, index)
+    return index
+
+
+def get_ordered_resolvers(realmname):
+    """
+    Return the names of the resolvers of a realm ordered by priority. The
+    resolver with the lowest priority is the first. Resolvers without a
+    priority are treated as having the priority 1000.
+    The list is only built once for every realm configuration and must not
+    be modified.
+
+    :param realmname: the name of the realm
+    :return: list of resolver names
+    :rtype: list
+    """
+    global _ordered_resolvers_index
+    realms = get_config_object().realm
+    indexed_realms, index = _ordered_resolvers_index
+    if indexed_realms is not realms:
+        # The configuration has been reloaded
+        index = {}
+        _ordered_resolvers_index = (realms, index)
+    resolvers = index.get(realmname)
+    if resolvers is None:
+        resolver_tuples = [(reso.get("name"), reso.get("priority") or 1000)
+                           for reso in realms.get(realmname, {}).get("resolver", [])]
+        # sort the resolvers by the 2nd entry in the tuple, the priority
+        resolvers = index[realmname] = [r[0] for r in sorted(resolver_tuples, key=itemgetter(1))]
+    return resolvers
+
+
 def get_realm_id(realmname):
     """
     Returns the realm_id for a realm name
@@ -99,11 +176,7 @@ def realm_is_defined(realm):
     :return: found or not found
     :rtype: boolean
     """
-    ret = False
-    realms = get_realms()
-    if realm.lower() in realms:
-        ret = True
-    return ret
+    return realm.lower() in get_realm_names()
 
 
 @log_with(log)
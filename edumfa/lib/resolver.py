@@ -297,9 +297,9 @@ def get_resolver_type(resolvername):
     :return: The type of the resolver
     :rtype: string
     """
-    reso_list = get_resolver_list(filter_resolver_name=resolvername)
-    r_type = reso_list.get(resolvername, {}).get("type")
-    return r_type
+    # The name has to match exactly, so we do not need to filter the
+    # resolver list case-insensitively
+    return get_config_object().resolver.get(resolvername, {}).get("type")
 
 
 @log_with(log)
@@ -665,8 +665,8 @@ class IdResolver (UserIdResolver):
         log.debug("login name filter: {!r}".format(loginname_filter))
         filter = "(&{0!s}({1!s}))".format(self.searchfilter, loginname_filter)
 
-        # create search attributes
-        attributes = list(self.userinfo.values())
+        # We only need the attribute of the user id. The DN is always returned.
+        attributes = []
         if self.uidtype.lower() != "dn":
             attributes.append(str(self.uidtype))
 
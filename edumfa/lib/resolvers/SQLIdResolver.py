@@ -336,14 +336,18 @@ class IdResolver (UserIdResolver):
             conditions = self._append_where_filter(conditions, self.TABLE,
                                                    self.where)
             filter_condition = and_(*conditions)
-            result = self.session.execute(select(self.TABLE).filter(filter_condition))
+            # We only need the column of the user id
+            userid_column = self.TABLE.columns[self.map.get("userid")]
+            result = self.session.execute(select(userid_column).filter(filter_condition))
 
-            for r in result.mappings():
+            for r in result.scalars():
                 if userid != "":    # pragma: no cover
                     raise Exception("More than one user with loginname"
                                     " %s found!" % LoginName)
-                user = self._get_user_from_mapped_object(r)
-                userid = convert_column_to_unicode(user["userid"])
+                if not r:  # pragma: no cover
+                    raise Exception("Empty user ID for loginname"
+                                    " %s found!" % LoginName)
+                userid = convert_column_to_unicode(r)
         except Exception as exx:    # pragma: no cover
             log.error("Could not get the user ID: {0!r}".format(exx))
 
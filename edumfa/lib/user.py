@@ -45,15 +45,19 @@ from .log import log_with
 from .resolver import (get_resolver_object,
                        get_resolver_type)
 
-from .realm import (get_realms, realm_is_defined,
+from .realm import (get_realm_names,
                     get_default_realm,
-                    get_realm, get_realm_id)
+                    get_realm, get_realm_id, get_resolver_realms,
+                    get_ordered_resolvers)
 from .config import get_from_config, SYSCONF
 from .usercache import (user_cache, cache_username, user_init, delete_user_cache)
 from edumfa.models import CustomUserAttribute, db
 
 log = logging.getLogger(__name__)
 
+# The maximum number of users in one query for custom attributes
+ATTRIBUTE_QUERY_CHUNK_SIZE = 500
+
 
 class User(object):
     """
@@ -72,9 +76,11 @@ class User(object):
     realm = ""
     resolver = ""
 
-    # NOTE: Directly decorating the class ``User`` breaks ``isinstance`` checks,
-    # which is why we have to decorate __init__
-    @log_with(log)
+    # The cached user info and the user it was read for
+    _info = None
+
+    # NOTE: User objects are created very often, so we do not decorate
+    # __init__ with log_with, but only log the created object.
     def __init__(self, login="", realm="", resolver="", uid=None):
         self.login = login or ""
         self.used_login = self.login
@@ -85,16 +91,22 @@ class User(object):
         self.resolver = resolver or ""
         self.uid = uid
         self.rtype = None
+        # The resolver object, in which the user was located during the creation
+        self._located_resolver = None
         if not self.login and not self.resolver and uid is not None:
             raise UserError("Can not create a user object from a uid without a resolver!")
         # Enrich user object with information from the userstore or from the
         # usercache
         if login or uid is not None:
             self._get_user_from_userstore()
-            # Just store the resolver type
-            self.rtype = get_resolver_type(self.resolver)
+            # Just store the resolver type, if the user was found in a resolver
+            if self.resolver:
+                self.rtype = get_resolver_type(self.resolver)
             # Add realm_id to User object
-            self.realm_id = get_realm_id(self.realm)
+            if self.realm:
+                self.realm_id = get_realm_id(self.realm)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Created user object %r with uid %r", self, self.uid)
 
     @user_cache(user_init)
     def _get_user_from_userstore(self):
@@ -104,7 +116,10 @@ class User(object):
 
         # Get Identifiers
         if self.resolver:
-            y = get_resolver_object(self.resolver)
+            y = self._located_resolver
+            self._located_resolver = None
+            if y is None:
+                y = get_resolver_object(self.resolver)
             if y is None:
                 raise UserError("The resolver '{0!s}' does not exist!".format(
                     self.resolver))
@@ -135,17 +150,19 @@ class User(object):
         :return: True or False
         :rtype: bool
         """
+        if self is other:
+            return True
         if not isinstance(other, type(self)):
-            log.info("Comparing a non-user object: {0!s} != {1!s}.".format(self, type(other)))
+            log.info("Comparing a non-user object: %s != %s.", self, type(other))
             return False
         if (self.resolver != other.resolver) or (self.realm != other.realm):
             log.info("Users are not in the same resolver and realm: "
-                     "{0!s} != {1!s}.".format(self, other))
+                     "%s != %s.", self, other)
             return False
         if self.uid and other.uid:
-            log.debug("Comparing based on uid: {0!s} vs {1!s}".format(self.uid, other.uid))
+            log.debug("Comparing based on uid: %s vs %s", self.uid, other.uid)
             return self.uid == other.uid
-        log.debug("Comparing based on login: {0!s} vs {1!s}".format(self.login, other.login))
+        log.debug("Comparing based on login: %s vs %s", self.login, other.login)
         return self.login == other.login
 
     def __ne__(self, other):
@@ -180,7 +197,6 @@ class User(object):
 
     __nonzero__ = __bool__
     
-    @log_with(log)
     def get_ordererd_resolvers(self):
         """
         returns a list of resolvernames ordered by priority.
@@ -189,19 +205,8 @@ class User(object):
 
         :return: list or resolvernames
         """
-        resolver_tuples = []
-        realm_config = get_realms(self.realm)
-        resolvers_in_realm = realm_config.get(self.realm, {})\
-                                         .get("resolver", {})
-        for resolver in resolvers_in_realm:
-            # append a tuple
-            resolver_tuples.append((resolver.get("name"),
-                             resolver.get("priority") or 1000))
-
-        # sort the resolvers by the 2nd entry in the tuple, the priority
-        resolvers = sorted(resolver_tuples, key=lambda resolver: resolver[1])
-        resolvers = [r[0] for r in resolvers]
-        return resolvers
+        # return a copy, since the list is shared
+        return list(get_ordered_resolvers(self.realm))
 
     def _get_resolvers(self, all_resolvers=False):
         """
@@ -242,21 +247,21 @@ class User(object):
         """
         y = get_resolver_object(resolvername)
         if y is None:  # pragma: no cover
-            log.info("Resolver {0!r} not found!".format(resolvername))
+            log.info("Resolver %r not found!", resolvername)
             return False
         else:
             uid = y.getUserId(self.login)
             if uid not in ["", None]:
-                log.info("user {0!r} found in resolver {1!r}".format(self.login,
-                                                                     resolvername))
-                log.info("userid resolved to {0!r} ".format(uid))
+                log.info("user %r found in resolver %r", self.login, resolvername)
+                log.info("userid resolved to %r ", uid)
                 self.resolver = resolvername
                 self.uid = uid
+                self._located_resolver = y
                 # We do not need to search other resolvers!
                 return True
             else:
-                log.debug("user {0!r} not found"
-                          " in resolver {1!r}".format(self.login, resolvername))
+                log.debug("user %r not found"
+                          " in resolver %r", self.login, resolvername)
                 return False
 
     def get_user_identifiers(self):
@@ -284,7 +289,9 @@ class User(object):
     @property
     def info(self):
         """
-        return the detailed information for the user
+        return the detailed information for the user.
+        The information is only read once from the user store and must not
+        be modified.
 
         :return: a dict with all the userinformation
         :rtype: dict
@@ -292,6 +299,10 @@ class User(object):
         if self.is_empty():
             # An empty user has no info
             return {}
+        # The login, realm or resolver may have been changed since the info was read
+        key = (self.login, self.realm, self.resolver, self.uid, self.realm_id)
+        if self._info and self._info[0] == key:
+            return self._info[1]
         (uid, _rtype, _resolver) = self.get_user_identifiers()
         if uid == None:
             return {}
@@ -299,6 +310,7 @@ class User(object):
         userInfo = y.getUserInfo(uid)
         # Now add the custom attributes, this is used e.g. in ADDUSERINRESPONSE
         userInfo.update(self.attributes)
+        self._info = (key, userInfo)
         return userInfo
 
     @log_with(log)
@@ -312,6 +324,7 @@ class User(object):
         """
         ua = CustomUserAttribute(user_id=self.uid, resolver=self.resolver, realm_id=self.realm_id,
                                  Key=attrkey, Value=attrvalue, Type=attrtype).save()
+        self._info = None
         return ua
 
     @property
@@ -333,11 +346,13 @@ class User(object):
         """
         if attrkey:
             ua = CustomUserAttribute.query.filter_by(user_id=self.uid, resolver=self.resolver,
-                                                     realm_id=self.realm_id, Key=attrkey).delete()
+                                                     realm_id=self.realm_id,
+                                                     Key=attrkey).delete(synchronize_session=False)
         else:
             ua = CustomUserAttribute.query.filter_by(user_id=self.uid, resolver=self.resolver,
-                                                     realm_id=self.realm_id).delete()
+                                                     realm_id=self.realm_id).delete(synchronize_session=False)
         db.session.commit()
+        self._info = None
         return ua
 
     @log_with(log)
@@ -357,18 +372,18 @@ class User(object):
         userinfo = self.info
         if phone_type in userinfo:
             phone = userinfo[phone_type]
-            log.debug("got user phone {0!r} of type {1!r}".format(phone, phone_type))
+            log.debug("got user phone %r of type %r", phone, phone_type)
             if type(phone) == list and index is not None:
                 if len(phone) > index:
                     return phone[index]
                 else:
-                    log.warning("userobject ({0!r}) has not that much "
-                                "phone numbers ({1!r} of {2!r}).".format(self, index, phone))
+                    log.warning("userobject (%r) has not that much "
+                                "phone numbers (%r of %r).", self, index, phone)
                     return ""
             else:
                 return phone
         else:
-            log.warning("userobject ({0!r}) has no phone of type {1!r}.".format(self, phone_type))
+            log.warning("userobject (%r) has no phone of type %r.", self, phone_type)
             return ""
 
     @log_with(log)
@@ -383,7 +398,6 @@ class User(object):
         :return: realms of the user
         :rtype: list
         """
-        allRealms = get_realms()
         Realms = []
         if self.realm == "" and self.resolver == "":
             defRealm = get_default_realm().lower()
@@ -395,14 +409,9 @@ class User(object):
             # User has no realm!
             # we have got a resolver and will get all realms
             # the resolver belongs to.
-            for key, val in allRealms.items():
-                log.debug("evaluating realm {0!r}: {1!r} ".format(key, val))
-                for reso in val.get('resolver', []):
-                    resoname = reso.get("name")
-                    if resoname == self.resolver:
-                        Realms.append(key.lower())
-                        log.debug("added realm %r to Realms due to "
-                                  "resolver %r" % (key, self.resolver))
+            Realms.extend(get_resolver_realms().get(self.resolver, []))
+            log.debug("added realms %r to Realms due to "
+                      "resolver %r", Realms, self.resolver)
         return Realms
     
     @log_with(log, log_entry=False)
@@ -418,7 +427,7 @@ class User(object):
         success = None
         try:
             log.info("User %r from realm %r tries to "
-                     "authenticate" % (self.login, self.realm))
+                     "authenticate", self.login, self.realm)
             res = self._get_resolvers()
             # Now we know, the resolvers of this user and we can verify the
             # password
@@ -427,9 +436,9 @@ class User(object):
                 uid, _rtype, _rname = self.get_user_identifiers()
                 if y.checkPass(uid, password):
                     success = "{0!s}@{1!s}".format(self.login, self.realm)
-                    log.debug("Successfully authenticated user {0!r}.".format(self))
+                    log.debug("Successfully authenticated user %r.", self)
                 else:
-                    log.info("user {0!r} failed to authenticate.".format(self))
+                    log.info("user %r failed to authenticate.", self)
 
             elif not res:
                 log.error("The user {0!r} exists in NO resolver.".format(self))
@@ -460,7 +469,7 @@ class User(object):
                 searchFields[reso] = sf
     
             except Exception as e:  # pragma: no cover
-                log.warning("module {0!r}: {1!r}".format(reso, e))
+                log.warning("module %r: %r", reso, e)
     
         return searchFields
 
@@ -481,27 +490,28 @@ class User(object):
             attributes["password"] = password
         success = False
         try:
-            log.info("User info for user {0!r}@{1!r} about to "
-                     "be updated.".format(self.login, self.realm))
+            log.info("User info for user %r@%r about to "
+                     "be updated.", self.login, self.realm)
             res = self._get_resolvers()
             # Now we know, the resolvers of this user and we can update the
             # user
             if len(res) == 1:
                 y = get_resolver_object(self.resolver)
                 if not y.updateable:  # pragma: no cover
-                    log.warning("The resolver {0!r} is not updateable.".format(y))
+                    log.warning("The resolver %r is not updateable.", y)
                 else:
                     uid, _rtype, _rname = self.get_user_identifiers()
                     if y.update_user(uid, attributes):
                         success = True
+                        self._info = None
                         # Delete entries corresponding to the old username from the user cache
                         delete_user_cache(username=self.login, resolver=self.resolver)
                         # If necessary, update the username
                         if attributes.get("username"):
                             self.login = attributes.get("username")
-                        log.info("Successfully updated user {0!r}.".format(self))
+                        log.info("Successfully updated user %r.", self)
                     else:  # pragma: no cover
-                        log.info("user {0!r} failed to update.".format(self))
+                        log.info("user %r failed to update.", self)
 
             elif not res:  # pragma: no cover
                 log.error("The user {0!r} exists in NO resolver.".format(self))
@@ -520,22 +530,22 @@ class User(object):
         """
         success = False
         try:
-            log.info("User {0!r}@{1!r} about to be deleted.".format(self.login, self.realm))
+            log.info("User %r@%r about to be deleted.", self.login, self.realm)
             res = self._get_resolvers()
             # Now we know, the resolvers of this user and we can delete it
             if len(res) == 1:
                 y = get_resolver_object(self.resolver)
                 if not y.updateable:  # pragma: no cover
-                    log.warning("The resolver {0!r} is not updateable.".format(y))
+                    log.warning("The resolver %r is not updateable.", y)
                 else:
                     uid, _rtype, _rname = self.get_user_identifiers()
                     if y.delete_user(uid):
                         success = True
-                        log.info("Successfully deleted user {0!r}.".format(self))
+                        log.info("Successfully deleted user %r.", self)
                         # Delete corresponding entry from the user cache
                         delete_user_cache(username=self.login, resolver=self.resolver)
                     else:  # pragma: no cover
-                        log.info("user {0!r} failed to update.".format(self))
+                        log.info("user %r failed to update.", self)
 
             elif not res:  # pragma: no cover
                 log.error("The user {0!r} exists in NO resolver.".format(self))
@@ -576,7 +586,6 @@ def create_user(resolvername, attributes, password=None):
     return uid
 
 
-@log_with(log)
 def split_user(username):
     """
     Split the username of the form user@realm into the username and the realm
@@ -603,7 +612,7 @@ def split_user(username):
     if split_at_sign:
         l = user.split('@')
         if len(l) >= 2:
-            if realm_is_defined(l[-1]):
+            if l[-1].lower() in get_realm_names():
                 # split the last only if the last part is really a realm
                 (user, realm) = user.rsplit('@', 1)
         else:
@@ -666,7 +675,8 @@ def get_user_list(param=None, user=None, custom_attributes=False):
     :return: list of dictionaries
     """
     users = []
-    resolvers = []
+    # The resolver names in the order of their appearance without duplicates
+    resolvers = {}
     searchDict = {"username": "*"}
     param = param or {}
 
@@ -677,14 +687,14 @@ def get_user_list(param=None, user=None, custom_attributes=False):
         if key in ["realm", "resolver", "user", "username"]:
             continue
         searchDict[key] = lval
-        log.debug("Parameter key:{0!r}={1!r}".format(key, lval))
+        log.debug("Parameter key:%r=%r", key, lval)
 
     # update searchdict depending on existence of 'user' or 'username' in param
     # Since 'user' takes precedence over 'username' we have to check the order
-    if 'username' in param:
-        searchDict['username'] = param['username']
     if 'user' in param:
         searchDict['username'] = param['user']
+    elif 'username' in param:
+        searchDict['username'] = param['username']
     log.debug('Changed search key to username: %s.', searchDict['username'])
 
     # determine which scope we want to show
@@ -698,41 +708,41 @@ def get_user_list(param=None, user=None, custom_attributes=False):
         
     # Append all possible resolvers
     if param_resolver:
-        resolvers.append(param_resolver)
+        resolvers[param_resolver] = None
     if user_resolver:
-        resolvers.append(user_resolver)
-    for pu_realm in [param_realm, user_realm]:
+        resolvers[user_resolver] = None
+    for pu_realm in [param_realm] if param_realm == user_realm else [param_realm, user_realm]:
         if pu_realm:
             realm_config = get_realm(pu_realm)
             for r in realm_config.get("resolver", {}):
                 if r.get("name"):
-                    resolvers.append(r.get("name"))
+                    resolvers[r.get("name")] = None
 
     if not (param_resolver or user_resolver or param_realm or user_realm):
         # if no realm or resolver was specified, we search the resolvers
         # in all realms
-        all_realms = get_realms()
-        for _name, res_list in all_realms.items():
-            for resolver_entry in res_list.get("resolver"):
-                resolvers.append(resolver_entry.get("name"))
+        resolvers.update(dict.fromkeys(get_resolver_realms()))
+
+    # The realm of the custom attributes is the same for all resolvers
+    realm_id = get_realm_id(param_realm or user_realm) if custom_attributes else None
 
-    for resolver_name in set(resolvers):
+    for resolver_name in resolvers:
         try:
-            log.debug("Check for resolver class: {0!r}".format(resolver_name))
+            log.debug("Check for resolver class: %r", resolver_name)
             y = get_resolver_object(resolver_name)
-            log.debug("with this search dictionary: {0!r} ".format(searchDict))
+            log.debug("with this search dictionary: %r ", searchDict)
             ulist = y.getUserList(searchDict)
             # Add resolvername to the list
-            realm_id = get_realm_id(param_realm or user_realm)
             for ue in ulist:
                 ue["resolver"] = resolver_name
                 ue["editable"] = y.editable
-            if custom_attributes and realm_id is not None:
+            if realm_id is not None:
+                # Add the custom attributes of all users of the resolver
+                # with uid, resolvername and realm_id, which we need to determine by the realm name
+                attributes = get_attributes_bulk([ue.get("userid") for ue in ulist], resolver_name, realm_id)
                 for ue in ulist:
-                    # Add the custom attributes, by class method from User
-                    # with uid, resolvername and realm_id, which we need to determine by the realm name
-                    ue.update(get_attributes(ue.get("userid"), ue.get("resolver"), realm_id))
-            log.debug("Found this userlist: {0!r}".format(ulist))
+                    ue.update(attributes.get(ue.get("userid"), {}))
+            log.debug("Found this userlist: %r", ulist)
             users.extend(ulist)
 
         except KeyError as exx:  # pragma: no cover
@@ -790,10 +800,44 @@ def get_attributes(uid, resolver, realm_id):
     :param realm_id: The realm_id
     :return: A dictionary of key/values
     """
+    return get_attributes_bulk([uid], resolver, realm_id).get(uid, {})
+
+
+def get_attributes_bulk(uids, resolver, realm_id):
+    """
+    Returns the attributes for the given users of one resolver.
+    The attributes are read with one query for up to
+    ``ATTRIBUTE_QUERY_CHUNK_SIZE`` users.
+
+    :param uids: A list of UIDs of the users
+    :param resolver: The name of the resolver
+    :param realm_id: The realm_id
+    :return: A dictionary with the UID as key and a dictionary of key/values
+        as value. Users without attributes are not contained.
+    """
     r = {}
-    attributes = CustomUserAttribute.query.filter_by(user_id=uid, resolver=resolver, realm_id=realm_id).all()
-    for attr in attributes:
-        r[attr.Key] = attr.Value
+    # The user_id is stored as string, but resolvers may return other types
+    uid_map = {str(uid): uid for uid in uids if uid is not None}
+    stored_uids = list(uid_map)
+    # Depending on the collation (e.g. on MySQL) the database also returns
+    # rows, whose user_id differs in case or trailing spaces
+    folded_uid_map = {}
+    for stored_uid, uid in uid_map.items():
+        folded_uid_map.setdefault(stored_uid.rstrip(" ").lower(), []).append(uid)
+    for i in range(0, len(stored_uids), ATTRIBUTE_QUERY_CHUNK_SIZE):
+        # We only need the columns and no ORM objects
+        rows = db.session.query(CustomUserAttribute.user_id, CustomUserAttribute.Key,
+                                CustomUserAttribute.Value).filter(
+            CustomUserAttribute.user_id.in_(stored_uids[i:i + ATTRIBUTE_QUERY_CHUNK_SIZE]),
+            CustomUserAttribute.resolver == resolver,
+            CustomUserAttribute.realm_id == realm_id)
+        for user_id, key, value in rows:
+            if user_id in uid_map:
+                matching_uids = [uid_map[user_id]]
+            else:
+                matching_uids = folded_uid_map.get(user_id.rstrip(" ").lower(), [])
+            for uid in matching_uids:
+                r.setdefault(uid, {})[key] = value
     return r
 
 
@@ -802,4 +846,5 @@ def is_attribute_at_all():
     Check if there are custom user attributes at all
     :return: bool
     """
-    return bool(CustomUserAttribute.query.count())
+    # We do not need to count all rows, one row is enough
+    return db.session.query(CustomUserAttribute.id).limit(1).first() is not None
@@ -25,13 +25,22 @@ import functools
 import logging
 
 import datetime
+import threading
+
+import cachetools
 
 from edumfa.lib.config import get_from_config
+from edumfa.lib.framework import get_app_local_store
 from edumfa.models import UserCache, db
 from sqlalchemy import and_
 
 log = logging.getLogger(__name__)
 EXPIRATION_SECONDS = "UserCacheExpiration"
+# The entries of the user cache are additionally kept in memory for at most
+# LOCAL_CACHE_SECONDS, but are not used after their expiration in the database.
+LOCAL_CACHE_SIZE = 10000
+LOCAL_CACHE_SECONDS = 60
+_local_cache_lock = threading.Lock()
 
 
 class user_cache(object):
@@ -90,6 +99,36 @@ def is_cache_enabled():
     return bool(get_cache_time())
 
 
+def _get_local_cache():
+    """
+    :return: the in-memory cache of user cache entries, which is shared among
+        all threads of the application
+    """
+    store = get_app_local_store()
+    if "user_cache" not in store:
+        store.setdefault("user_cache", cachetools.TTLCache(LOCAL_CACHE_SIZE, LOCAL_CACHE_SECONDS))
+    return store["user_cache"]
+
+
+def _get_local_entry(key):
+    """
+    Return the value of a not yet expired in-memory entry or None.
+    """
+    with _local_cache_lock:
+        entry = _get_local_cache().get(key)
+    if entry and entry[1] >= datetime.datetime.now() - get_cache_time():
+        return entry[0]
+    return None
+
+
+def _add_local_entry(key, value, timestamp):
+    """
+    Keep the value of a user cache entry with the given timestamp in memory.
+    """
+    with _local_cache_lock:
+        _get_local_cache()[key] = (value, timestamp)
+
+
 def delete_user_cache(resolver=None, username=None, expired=None):
     """
     This completely deletes the user cache.
@@ -107,6 +146,9 @@ def delete_user_cache(resolver=None, username=None, expired=None):
                                      expired=expired)
     rowcount = db.session.query(UserCache).filter(filter_condition).delete()
     db.session.commit()
+    # The in-memory entries are not filtered, we simply drop all of them
+    with _local_cache_lock:
+        _get_local_cache().clear()
     log.info('Deleted {} entries from the user cache (resolver={!r}, username={!r}, expired={!r})'.format(
         rowcount, resolver, username, expired
     ))
@@ -129,6 +171,8 @@ def add_to_cache(username, used_login, resolver, user_id):
         log.debug('Adding record to cache: ({!r}, {!r}, {!r}, {!r}, {!r})'.format(
             username, used_login, resolver, user_id, timestamp))
         record.save()
+        _add_local_entry(("login", used_login, resolver), (username, resolver, user_id), timestamp)
+        _add_local_entry(("uid", user_id, resolver), username, timestamp)
 
 
 def retrieve_latest_entry(filter_condition):
@@ -184,12 +228,17 @@ def cache_username(wrapped_function, userid, resolvername):
     After a successful lookup, the entry is added to the cache.
     """
 
-    # try to fetch the record from the UserCache
-    filter_conditions = create_filter(user_id=userid,
-                                      resolver=resolvername)
-    result = retrieve_latest_entry(filter_conditions)
-    if result:
-        username = result.username
+    # try to fetch the record from memory or from the UserCache
+    key = ("uid", userid, resolvername)
+    username = _get_local_entry(key)
+    if username is None:
+        filter_conditions = create_filter(user_id=userid,
+                                          resolver=resolvername)
+        result = retrieve_latest_entry(filter_conditions)
+        if result:
+            username = result.username
+            _add_local_entry(key, username, result.timestamp)
+    if username is not None:
         log.debug('Found username of {!r}/{!r} in cache: {!r}'.format(userid, resolvername, username))
         return username
     else:
@@ -216,13 +265,17 @@ def user_init(wrapped_function, self):
         resolvers = self.get_ordererd_resolvers()
     for resolvername in resolvers:
         # If we could figure out a resolver, we can query the user cache
-        filter_conditions = create_filter(used_login=self.used_login, resolver=resolvername)
-        result = retrieve_latest_entry(filter_conditions)
-        if result:
+        key = ("login", self.used_login, resolvername)
+        cached = _get_local_entry(key)
+        if cached is None:
+            filter_conditions = create_filter(used_login=self.used_login, resolver=resolvername)
+            result = retrieve_latest_entry(filter_conditions)
+            if result:
+                cached = (result.username, result.resolver, result.user_id)
+                _add_local_entry(key, cached, result.timestamp)
+        if cached is not None:
             # Cached user exists, retrieve information and exit early
-            self.login = result.username
-            self.resolver = result.resolver
-            self.uid = result.user_id
+            self.login, self.resolver, self.uid = cached
             return
         else:
             # If the user does not exist in the cache, we actually query the resolver
@@ -1182,10 +1182,10 @@ class TokenOwner(MethodsMixin, db.Model):
     __tablename__ = 'tokenowner'
     __table_args__ = {'mysql_row_format': 'DYNAMIC'}
     id = db.Column(db.Integer(), Sequence("tokenowner_seq"), primary_key=True)
-    token_id = db.Column(db.Integer(), db.ForeignKey('token.id'))
+    token_id = db.Column(db.Integer(), db.ForeignKey('token.id'), index=True)
     resolver = db.Column(db.Unicode(120), default='', index=True)
     user_id = db.Column(db.Unicode(320), default='', index=True)
-    realm_id = db.Column(db.Integer(), db.ForeignKey('realm.id'))
+    realm_id = db.Column(db.Integer(), db.ForeignKey('realm.id'), index=True)
     # This creates an attribute "tokenowners" in the realm objects
     realm = db.relationship('Realm', lazy='joined', backref='tokenowners')
 
@@ -2688,20 +2688,22 @@ class EventCounter(db.Model):
         db.session.commit()
         return ret
 
-    def increase(self):
+    def increase(self, value=1):
         """
         Increase the value of a counter
+        :param value: The amount to increase the counter by
         :return:
         """
-        self.counter_value = self.counter_value + 1
+        self.counter_value = self.counter_value + value
         self.save()
 
-    def decrease(self):
+    def decrease(self, value=1):
         """
         Decrease the value of a counter.
+        :param value: The amount to decrease the counter by
         :return:
         """
-        self.counter_value = self.counter_value - 1
+        self.counter_value = self.counter_value - value
         self.save()
 
 
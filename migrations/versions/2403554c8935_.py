@@ -0,0 +1,49 @@
+"""Add indexes on tokenowner.token_id and tokenowner.realm_id
+
+Revision ID: 2403554c8935
+Revises: 0d011e94a8e8
+Create Date: 2026-10-14 15:02:11.482711
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '2403554c8935'
+down_revision = '0d011e94a8e8'
+
+from alembic import op, context
+import sqlalchemy as sa
+
+INDEXES = [('ix_tokenowner_token_id', 'token_id'),
+           ('ix_tokenowner_realm_id', 'realm_id')]
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    existing_indexes = {index.get("name") for index in insp.get_indexes('tokenowner')}
+    for index_name, column in INDEXES:
+        if index_name in existing_indexes:
+            print("Index {0!s} already exists.".format(index_name))
+        else:
+            op.create_index(op.f(index_name), 'tokenowner', [column], unique=False)
+
+
+def downgrade():
+    insp = sa.inspect(op.get_bind())
+    existing_indexes = {index.get("name") for index in insp.get_indexes('tokenowner')}
+    for index_name, column in INDEXES:
+        if index_name not in existing_indexes:
+            continue
+        if context.get_context().dialect.name in ['mariadb', 'mysql']:
+            # InnoDB uses the index for the foreign key on the column and
+            # refuses to drop it. Dropping and re-creating the foreign key lets
+            # InnoDB create its implicit index again.
+            foreign_keys = [fk for fk in insp.get_foreign_keys('tokenowner')
+                            if fk.get("constrained_columns") == [column]]
+            for fk in foreign_keys:
+                op.drop_constraint(fk.get("name"), 'tokenowner', type_='foreignkey')
+            op.drop_index(op.f(index_name), table_name='tokenowner')
+            for fk in foreign_keys:
+                op.create_foreign_key(fk.get("name"), 'tokenowner', fk.get("referred_table"),
+                                      [column], fk.get("referred_columns"))
+        else:
+            op.drop_index(op.f(index_name), table_name='tokenowner')
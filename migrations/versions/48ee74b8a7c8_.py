@@ -21,6 +21,10 @@ import sys
 
 Base = declarative_base()
 
+# names and columns of the indexes of the tokenowner table
+TOKENOWNER_INDEXES = [('ix_tokenowner_resolver', 'resolver'),
+                      ('ix_tokenowner_user_id', 'user_id')]
+
 
 class Realm(Base):
     __tablename__ = 'realm'
@@ -74,12 +78,23 @@ def create_seq(seq):
 
 
 def upgrade():
-    try:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    if insp.has_table('tokenowner'):
+        # Do not send DDL, which fails anyway, but add missing indexes
+        print("Table 'tokenowner' already exists.")
+        existing_indexes = {index.get("name") for index in insp.get_indexes('tokenowner')}
+        for index_name, column in TOKENOWNER_INDEXES:
+            if index_name not in existing_indexes:
+                op.create_index(op.f(index_name), 'tokenowner', [column], unique=False)
+    else:
         seq = Sequence('tokenowner_seq')
         try:
+            # The sequence may be left over from a failed migration
             create_seq(seq)
         except Exception as _e:
             pass
+        # The table does not exist yet, so an error here must abort the migration
         op.create_table('tokenowner',
                         sa.Column('id', sa.Integer(), seq, primary_key=True),
                         sa.Column('token_id', sa.Integer(), nullable=True),
@@ -89,20 +104,23 @@ def upgrade():
                         sa.ForeignKeyConstraint(['realm_id'], ['realm.id'], ),
                         sa.ForeignKeyConstraint(['token_id'], ['token.id'], ),
                         sa.PrimaryKeyConstraint('id'),
+                        *[sa.Index(op.f(index_name), column, unique=False)
+                          for index_name, column in TOKENOWNER_INDEXES],
                         mysql_row_format='DYNAMIC'
                         )
-        op.create_index(op.f('ix_tokenowner_resolver'), 'tokenowner', ['resolver'], unique=False)
-        op.create_index(op.f('ix_tokenowner_user_id'), 'tokenowner', ['user_id'], unique=False)
-    except Exception as exx:
-        print("Can not create table 'tokenowner'. It probably already exists")
-        print (exx)
 
     try:
-        bind = op.get_bind()
         session = orm.Session(bind=bind)
+        # Read the realms of all tokens and the resolvers at once instead of
+        # querying them for every single token
+        all_token_realms = {}
+        for token_realm in session.query(TokenRealm).order_by(TokenRealm.id):
+            all_token_realms.setdefault(token_realm.token_id, []).append(token_realm)
+        resolvers = {r.name: r for r in session.query(Resolver)}
+        tokenowners = []
         # For each token, that has an owner, create a tokenowner entry
         for token in session.query(Token).filter(Token.user_id != "", Token.user_id.isnot(None)):
-            token_realms = session.query(TokenRealm).filter(TokenRealm.token_id == token.id).all()
+            token_realms = all_token_realms.get(token.id, [])
             realm_id = None
             if not token_realms:
                 sys.stderr.write(u"{serial!s}, {userid!s}, {resolver!s}, "
@@ -115,7 +133,7 @@ def upgrade():
             elif len(token_realms) > 1:
                 # The token has more than one realm.
                 # In order to figure out the right realm, we first fetch the token's resolver
-                resolver = session.query(Resolver).filter_by(name=token.resolver).first()
+                resolver = resolvers.get(token.resolver)
                 if not resolver:
                     sys.stderr.write(u"{serial!s}, {userid!s}, {resolver!s}, "
                                      u"The token is assigned, but the assigned resolver can not "
@@ -169,9 +187,10 @@ def upgrade():
                                                                                                  resolver=token.resolver))
             # If we could not figure out a tokenowner realm, we skip the token assignment.
             if realm_id is not None:
-                to = TokenOwner(token_id=token.id, user_id=token.user_id,
-                                resolver=token.resolver, realm_id=realm_id)
-                session.add(to)
+                tokenowners.append({"token_id": token.id, "user_id": token.user_id,
+                                    "resolver": token.resolver, "realm_id": realm_id})
+        # Insert all token owners with one executemany
+        session.bulk_insert_mappings(TokenOwner, tokenowners)
         session.commit()
 
         # Now we drop the columns
@@ -186,8 +205,7 @@ def upgrade():
 
 
 def downgrade():
-    # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_index(op.f('ix_tokenowner_user_id'), table_name='tokenowner')
-    op.drop_index(op.f('ix_tokenowner_resolver'), table_name='tokenowner')
-    op.drop_table('tokenowner')
-    # ### end Alembic commands ###
+    # The table may be missing, if the upgrade failed. Dropping the table
+    # also drops its indexes.
+    if sa.inspect(op.get_bind()).has_table('tokenowner'):
+        op.drop_table('tokenowner')
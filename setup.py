@@ -42,6 +42,7 @@ install_requires = [
     "SQLAlchemy>=1.4.0",
     "argon2_cffi>=20.1.0",
     "beautifulsoup4[lxml]>=4.12.3",
+    "cachetools>=5.0.0",
     "cbor2>=5.0.1",
     "configobj>=5.0.6",
     "croniter>=0.3.8",
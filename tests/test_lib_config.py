@@ -22,7 +22,8 @@ from edumfa.lib.config import (get_resolver_list,
                                     get_machine_resolver_class_dict,
                                     get_edumfa_node, get_edumfa_nodes,
                                     this, get_config_object, invalidate_config_object,
-                                    get_multichallenge_enrollable_tokentypes)
+                                    get_multichallenge_enrollable_tokentypes,
+                                    SYSCONF)
 from edumfa.lib.resolvers.PasswdIdResolver import IdResolver as PWResolver
 from edumfa.lib.tokens.hotptoken import HotpTokenClass
 from edumfa.lib.tokens.totptoken import TotpTokenClass
@@ -222,6 +223,16 @@ class ConfigTestCase(MyTestCase):
         self.assertTrue("secretInfo1" not in a)
         a = get_from_config("secretInfo1", role="public")
         self.assertEqual(a, None)
+        a = get_from_config("secretInfo1", default="unknown", role="public")
+        self.assertEqual(a, "unknown")
+
+        # Some keys are true by default
+        self.assertTrue(get_from_config(SYSCONF.SPLITATSIGN, return_bool=True))
+        self.assertTrue(get_from_config(SYSCONF.SPLITATSIGN, role="public", return_bool=True))
+        self.assertEqual(get_from_config(SYSCONF.SPLITATSIGN), "True")
+        set_edumfa_config(SYSCONF.SPLITATSIGN, "0")
+        self.assertFalse(get_from_config(SYSCONF.SPLITATSIGN, return_bool=True))
+        delete_edumfa_config(SYSCONF.SPLITATSIGN)
 
     def test_07_node_names(self):
         node = get_edumfa_node()
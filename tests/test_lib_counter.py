@@ -152,4 +152,12 @@ class CounterTestCase(MyTestCase):
         reset("ctrB")
         self.assertEqual(read("ctrB"), 0)
         self.assertEqual(EventCounter.query.filter_by(counter_name="ctrB", node="node1").one().counter_value, 0)
-        self.assertEqual(EventCounter.query.filter_by(counter_name="ctrB", node="node2").one().counter_value, 0)
\ No newline at end of file
+        self.assertEqual(EventCounter.query.filter_by(counter_name="ctrB", node="node2").one().counter_value, 0)
+
+    def test_06_increase_and_decrease_by_value(self):
+        increase("ctrC", value=5)
+        self.assertEqual(read("ctrC"), 5)
+        decrease("ctrC", value=3)
+        self.assertEqual(read("ctrC"), 2)
+        decrease("ctrC", allow_negative=True, value=4)
+        self.assertEqual(read("ctrC"), -2)
@@ -23,9 +23,9 @@ from edumfa.lib.config import get_config_object
 from edumfa.lib.eventhandler.tokenhandler import (TokenEventHandler,
                                                        ACTION_TYPE, VALIDITY)
 from edumfa.lib.eventhandler.scripthandler import ScriptEventHandler, SCRIPT_WAIT
-from edumfa.lib.eventhandler.counterhandler import CounterEventHandler
+from edumfa.lib.eventhandler.counterhandler import CounterEventHandler, _flush_pending_changes, _flush_at_exit
 from edumfa.lib.eventhandler.responsemangler import ResponseManglerEventHandler
-from edumfa.models import EventCounter
+from edumfa.models import EventCounter, EventHandlerOption, EventHandlerCondition, db
 from edumfa.lib.eventhandler.federationhandler import FederationEventHandler
 from edumfa.lib.eventhandler.requestmangler import RequestManglerEventHandler
 from edumfa.lib.eventhandler.base import BaseEventHandler, CONDITION
@@ -34,7 +34,7 @@ from flask import Request
 from werkzeug.test import EnvironBuilder
 from edumfa.lib.event import (delete_event, set_event,
                                    EventConfiguration, get_handler_object,
-                                   enable_event)
+                                   enable_event, delete_all_events)
 from edumfa.lib.token import (init_token, remove_token, get_realms_of_token, get_tokens,
                                    add_tokeninfo)
 from edumfa.lib.tokenclass import DATE_FORMAT
@@ -140,6 +140,18 @@ class EventHandlerLibTestCase(MyTestCase):
         h_obj = get_handler_object("Federation")
         self.assertEqual(type(h_obj), FederationEventHandler)
 
+    def test_03_delete_all_events(self):
+        set_event("e1", event=["token_init"], handlermodule="UserNotification",
+                  action="sendmail", conditions={"bla": "yes"}, options={"emailconfig": "themis"})
+        set_event("e2", event=["token_init"], handlermodule="UserNotification",
+                  action="sendmail", options={"emailconfig": "themis"})
+        self.assertEqual(len(EventConfiguration().events), 2)
+        r = delete_all_events()
+        self.assertEqual(r, 2)
+        self.assertEqual(len(EventConfiguration().events), 0)
+        self.assertEqual(EventHandlerOption.query.count(), 0)
+        self.assertEqual(EventHandlerCondition.query.count(), 0)
+
 
 class BaseEventHandlerTestCase(MyTestCase):
 
@@ -704,6 +716,61 @@ class CounterEventTestCase(MyTestCase):
             counter = EventCounter.query.filter_by(counter_name="hallo_counter").first()
             self.assertEqual(counter.counter_value, 0)
 
+    def test_02_event_counter_coalesced(self):
+        options = {"handler_def": {
+                       "options": {
+                           "counter_name": "coalesced_counter",
+                           "coalesce_ms": "3600000"}
+                   }
+                   }
+
+        t_handler = CounterEventHandler()
+        self.assertIn("coalesce_ms", t_handler.actions["increase_counter"])
+        # the action definitions are only built once
+        self.assertIs(t_handler.actions, CounterEventHandler().actions)
+        t_handler.do("increase_counter", options=options)
+        t_handler.do("increase_counter", options=options)
+        t_handler.do("increase_counter", options=options)
+        # the changes are not written to the database yet
+        counter = EventCounter.query.filter_by(counter_name="coalesced_counter").first()
+        self.assertIsNone(counter)
+
+        # decreasing without negative values writes the collected changes first
+        t_handler.do("decrease_counter", options=options)
+        counter = EventCounter.query.filter_by(counter_name="coalesced_counter").first()
+        self.assertEqual(counter.counter_value, 2)
+
+        options['handler_def']['options']['allow_negative_values'] = True
+        t_handler.do("decrease_counter", options=options)
+        t_handler.do("decrease_counter", options=options)
+        t_handler.do("decrease_counter", options=options)
+        counter = EventCounter.query.filter_by(counter_name="coalesced_counter").first()
+        self.assertEqual(counter.counter_value, 2)
+        _flush_pending_changes()
+        counter = EventCounter.query.filter_by(counter_name="coalesced_counter").first()
+        self.assertEqual(counter.counter_value, -1)
+
+        # a reset discards the collected changes
+        t_handler.do("increase_counter", options=options)
+        t_handler.do("reset_counter", options=options)
+        _flush_pending_changes()
+        counter = EventCounter.query.filter_by(counter_name="coalesced_counter").first()
+        self.assertEqual(counter.counter_value, 0)
+
+        # the collected changes are written, when the process exits
+        t_handler.do("increase_counter", options=options)
+        _flush_at_exit(self.app)
+        # the changes were written in another session
+        db.session.expire_all()
+        counter = EventCounter.query.filter_by(counter_name="coalesced_counter").first()
+        self.assertEqual(counter.counter_value, 1)
+
+        # an invalid value writes the changes immediately
+        options['handler_def']['options']['coalesce_ms'] = "soon"
+        t_handler.do("increase_counter", options=options)
+        counter = EventCounter.query.filter_by(counter_name="coalesced_counter").first()
+        self.assertEqual(counter.counter_value, 2)
+
 
 class ScriptEventTestCase(MyTestCase):
 
@@ -23,6 +23,7 @@ from edumfa.lib.resolver import (save_resolver, get_resolver_list,
                                       delete_resolver)
 from edumfa.lib.error import ParameterError
 from edumfa.lib.user import User
+from edumfa.models import PolicyCondition
 from .base import PWFILE as FILE_PASSWORDS
 from .base import PWFILE2 as FILE_PASSWD
 
@@ -1161,6 +1162,19 @@ class PolicyTestCase(MyTestCase):
         self.assertEqual([p["name"] for p in policy_object.match_policies()], ["act2"])
         delete_policy("act2")
 
+    def test_27a_delete_all_policies(self):
+        set_policy("act1", scope=SCOPE.AUTH, action="{0!s}=userstore".format(ACTION.OTPPIN),
+                   conditions=[("userinfo", "type", "equals", "verysecure", True)])
+        set_policy("act2", scope=SCOPE.AUTH, action="{0!s}=none".format(ACTION.OTPPIN))
+        # policies, which are loaded into the session, are deleted as well
+        self.assertEqual(len(PolicyClass().list_policies()), 2)
+        r = delete_all_policies()
+        self.assertEqual(r, 2)
+        self.assertEqual(PolicyClass().list_policies(), [])
+        self.assertEqual(PolicyCondition.query.count(), 0)
+        # nothing left to delete
+        self.assertEqual(delete_all_policies(), 0)
+
     def test_28_conditions(self):
         rid = save_resolver({"resolver": "reso1",
                              "type": "passwdresolver",
@@ -14,7 +14,9 @@ from edumfa.lib.realm import (set_realm,
                                    get_default_realm,
                                    realm_is_defined,
                                    set_default_realm,
-                                   delete_realm)
+                                   delete_realm,
+                                   get_resolver_realms,
+                                   get_realm_names)
 
 
 class ResolverTestCase(MyTestCase):
@@ -93,6 +95,28 @@ class ResolverTestCase(MyTestCase):
         realm = get_default_realm()
         self.assertTrue(realm is None, realm)
 
+    def test_04_get_resolver_realms(self):
+        resolver_realms = get_resolver_realms()
+        self.assertEqual(resolver_realms, {self.resolvername1: [self.realm1],
+                                           self.resolvername2: ["realm2"]})
+        # the result is reused until the configuration changes
+        self.assertIs(get_resolver_realms(), resolver_realms)
+        set_realm("realm3", [self.resolvername1])
+        self.assertEqual(get_resolver_realms().get(self.resolvername1), [self.realm1, "realm3"])
+        delete_realm("realm3")
+        self.assertEqual(get_resolver_realms().get(self.resolvername1), [self.realm1])
+
+    def test_05_get_realm_names(self):
+        realm_names = get_realm_names()
+        self.assertEqual(realm_names, {self.realm1, "realm2"})
+        self.assertIs(get_realm_names(), realm_names)
+        set_realm("realm3", [self.resolvername1])
+        self.assertIn("realm3", get_realm_names())
+        self.assertTrue(realm_is_defined("REALM3"))
+        delete_realm("realm3")
+        self.assertNotIn("realm3", get_realm_names())
+        self.assertFalse(realm_is_defined("realm3"))
+
     def test_10_delete_realm(self):
         delete_realm(self.realm1)
         delete_realm("realm2")
@@ -6,6 +6,7 @@ The lib.user.py only depends on the database model
 """
 import logging
 
+import mock
 from testfixtures import log_capture
 
 from .base import MyTestCase
@@ -17,6 +18,8 @@ from edumfa.lib.user import (User, create_user,
                                   get_user_list,
                                   split_user,
                                   get_user_from_param,
+                                  get_attributes_bulk,
+                                  is_attribute_at_all,
                                   UserError)
 from edumfa.lib.user import log as user_log
 from . import ldap3mock
@@ -406,6 +409,12 @@ class UserTestCase(MyTestCase):
         self.assertEqual(r[2], "reso3")
         self.assertEqual(r[3], "resolver1")
 
+        # a changed priority is taken into account
+        set_realm("sort_realm", ["resolver1", "resolver2"],
+                  priority={"resolver1": 1, "resolver2": 10})
+        r = User("root", "sort_realm").get_ordererd_resolvers()
+        self.assertEqual(r, ["resolver1", "resolver2"])
+
         delete_realm("sort_realm")
 
     def test_17_check_nonascii_user(self):
@@ -520,11 +529,41 @@ class UserTestCase(MyTestCase):
         delete_realm("ldap")
         delete_resolver("ldapresolver")
 
+    def test_20_hash_and_str(self):
+        user = User(login="root", realm=self.realm1)
+        self.assertEqual(str(user), "<root.resolver1@realm1>")
+        self.assertEqual(hash(user), hash(User(login="root", realm=self.realm1)))
+        # changing the user updates the hash and the string representation
+        user.login = "cornelius"
+        self.assertEqual(str(user), "<cornelius.resolver1@realm1>")
+        self.assertEqual(hash(user), hash(User(login="cornelius", realm=self.realm1)))
+        user.realm = ""
+        user.login = ""
+        self.assertEqual(str(user), "<empty user>")
+
+    def test_21_cached_info(self):
+        user = User(login="root", realm=self.realm1)
+        info = user.info
+        self.assertEqual(info.get("username"), "root")
+        # the info is only read once from the user store
+        self.assertIs(user.info, info)
+        # setting an attribute refreshes the info
+        user.set_attribute("hans", "wurst")
+        self.assertEqual(user.info.get("hans"), "wurst")
+        user.delete_attribute("hans")
+        self.assertNotIn("hans", user.info)
+        # changing the user refreshes the info
+        user.login = "cornelius"
+        user.uid = User(login="cornelius", realm=self.realm1).uid
+        self.assertEqual(user.info.get("username"), "cornelius")
+
     def test_50_user_attributes(self):
         user = User(login="root",
                     realm=self.realm1)
+        self.assertFalse(is_attribute_at_all())
         r = user.set_attribute("hans", "wurst")
         self.assertTrue(r > 0)
+        self.assertTrue(is_attribute_at_all())
         r = user.set_attribute("hugen", "dubel")
         self.assertTrue(r > 1)
         attrs = user.attributes
@@ -549,3 +588,33 @@ class UserTestCase(MyTestCase):
         self.assertEqual(attrs.get("hans"), None)
         self.assertEqual(attrs.get("hugen"), None)
         self.assertEqual(attrs.get("key"), None)
+        self.assertFalse(is_attribute_at_all())
+
+    def test_51_user_attributes_bulk(self):
+        root = User(login="root", realm=self.realm1)
+        daemon = User(login="daemon", realm=self.realm1)
+        root.set_attribute("hans", "wurst")
+        daemon.set_attribute("hans", "meiser")
+        daemon.set_attribute("hugen", "dubel")
+        attrs = get_attributes_bulk([root.uid, daemon.uid, "4711"], root.resolver, root.realm_id)
+        self.assertEqual(attrs, {root.uid: {"hans": "wurst"},
+                                 daemon.uid: {"hans": "meiser", "hugen": "dubel"}})
+        # the attributes are added to the user list
+        ulist = get_user_list({"realm": self.realm1}, custom_attributes=True)
+        users = {ue.get("username"): ue for ue in ulist}
+        self.assertEqual(users["root"].get("hans"), "wurst")
+        self.assertEqual(users["daemon"].get("hans"), "meiser")
+        self.assertEqual(users["daemon"].get("hugen"), "dubel")
+        self.assertNotIn("hans", users["bin"])
+        root.delete_attribute()
+        daemon.delete_attribute()
+        self.assertEqual(get_attributes_bulk([root.uid, daemon.uid], root.resolver, root.realm_id), {})
+
+    def test_52_user_attributes_bulk_collation(self):
+        # Depending on the collation, the database returns user_ids, which
+        # differ in case or trailing spaces from the requested ones
+        rows = [("ABC ", "hans", "wurst"), ("abc", "hugen", "dubel"), ("unknown", "hans", "meiser")]
+        with mock.patch("edumfa.lib.user.db.session.query") as mock_query:
+            mock_query.return_value.filter.return_value = rows
+            attrs = get_attributes_bulk(["abc", "4711"], "reso1", 1)
+        self.assertEqual(attrs, {"abc": {"hans": "wurst", "hugen": "dubel"}})
@@ -493,6 +493,31 @@ class UserCacheTestCase(MyTestCase):
         self.assertEqual(r, "user1")
         self.assertEqual(self.counter, 1)
 
+    def test_14_local_cache(self):
+        delete_user_cache()
+
+        def get_username(uid, resolver):
+            return "user1"
+
+        # The first lookup adds the entry to the database and to memory
+        self.assertEqual(cache_username(get_username, "uid1", "reso1"), "user1")
+        with patch('edumfa.lib.usercache.retrieve_latest_entry') as mock_retrieve:
+            self.assertEqual(cache_username(get_username, "uid1", "reso1"), "user1")
+            mock_retrieve.assert_not_called()
+        # Entries of the database are kept in memory as well
+        UserCache("hans1", "hans1", "resolver1", "uid1", datetime.now()).save()
+        self.assertEqual(cache_username(get_username, "uid1", "resolver1"), "hans1")
+        with patch('edumfa.lib.usercache.retrieve_latest_entry') as mock_retrieve:
+            self.assertEqual(cache_username(get_username, "uid1", "resolver1"), "hans1")
+            mock_retrieve.assert_not_called()
+        # Deleting the user cache also drops the entries in memory
+        delete_user_cache()
+        with patch('edumfa.lib.usercache.retrieve_latest_entry') as mock_retrieve:
+            mock_retrieve.return_value = None
+            self.assertEqual(cache_username(get_username, "uid1", "resolver1"), "user1")
+            self.assertEqual(mock_retrieve.call_count, 1)
+        delete_user_cache()
+
     def test_99_unset_config(self):
         # Test early exit!
         # Assert that the function `retrieve_latest_entry` is called if the cache is enabled
@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
 
 import datetime
+import json
 import os
 import tempfile
 import unittest
 
 from edumfa.app import create_app
 from edumfa.commands.manage.main import cli as edumfa_manage
+from edumfa.commands.manage.helper import import_conf_policy
+from edumfa.lib.error import ParameterError
 from edumfa.models import db, EventHandler, Policy
 from edumfa.lib.auditmodules.sqlaudit import LogEntry
 
@@ -190,7 +193,7 @@ class ScriptsTestCase(unittest.TestCase):
         assert result.exit_code == 0
         policies = Policy.query.all()
         assert len(policies) == 2
-        assert "Deleted policy ui-totp with result 3" in result.output
+        assert "Deleted 3 policies" in result.output
 
         Policy(name="ui-totp", active=True).save()
         result = runner.invoke(edumfa_manage, ["policy", "import", "-p", "-u", "-f", "tests/testdata/policy.conf"])
@@ -214,6 +217,39 @@ class ScriptsTestCase(unittest.TestCase):
         policies = Policy.query.all()
         assert policies[0].active
 
+    def test_05a_edumfa_policy_import_rollback(self):
+        runner = self.app.test_cli_runner()
+        stored_names = sorted(p.name for p in Policy.query.all())
+        assert stored_names
+        policies = [{"name": "rollback-pol1", "scope": "webui", "action": "logout_time=120"},
+                    {"name": "rollback-pol2", "scope": "webui", "action": "logout_time=120"},
+                    # an invalid priority makes the import fail
+                    {"name": "rollback-pol3", "scope": "webui", "action": "logout_time=120", "priority": 0}]
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            json.dump({"policy": policies}, f)
+        try:
+            result = runner.invoke(edumfa_manage, ["policy", "import", "-c", "-f", f.name])
+        finally:
+            os.remove(f.name)
+        assert result.exit_code != 0
+        assert "Deleted {0:d} policies".format(len(stored_names)) in result.output
+        # Neither the cleanup nor the added policies were committed
+        db.session.expire_all()
+        assert sorted(p.name for p in Policy.query.all()) == stored_names
+
+    def test_05b_edumfa_policy_import_rollback_batches(self):
+        stored_names = sorted(p.name for p in Policy.query.all())
+        assert stored_names
+        policies = [{"name": "batch-pol{0!s}".format(i), "scope": "webui", "action": "logout_time=120"}
+                    for i in range(4)]
+        # an invalid priority makes the import fail after the first batches
+        policies.append({"name": "batch-pol4", "scope": "webui", "action": "logout_time=120", "priority": 0})
+        with self.assertRaises(ParameterError):
+            import_conf_policy(policies, cleanup=True, batch_size=2)
+        # Neither the cleanup nor any of the added policies were committed
+        db.session.expire_all()
+        assert sorted(p.name for p in Policy.query.all()) == stored_names
+
     def test_06_core_commands(self):
         runner = self.app.test_cli_runner()
         dir = tempfile.mkdtemp()
@@ -258,3 +294,28 @@ class ScriptsTestCase(unittest.TestCase):
         result = runner.invoke(edumfa_manage, ["audit", "rotate", "--age", "30"])
         assert result.exit_code == 0
         assert len(LogEntry.query.all()) == 0
+
+    def test_08_import_json(self):
+        runner = self.app.test_cli_runner()
+        for policy in Policy.query.all():
+            policy.delete()
+        result = runner.invoke(edumfa_manage, ["policy", "import", "-f", "tests/testdata/policy.json"])
+        assert result.exit_code == 0
+        policies = Policy.query.all()
+        assert len(policies) == 2
+        assert "Added policy hide_welcome with result" in result.output
+        assert sorted(p.name for p in policies) == ["hide_welcome", "user-UI-TOTP"]
+
+    def test_09_export_json(self):
+        runner = self.app.test_cli_runner()
+        filename = os.path.join(tempfile.mkdtemp(), "policy.json")
+        result = runner.invoke(edumfa_manage, ["policy", "export", "-f", filename])
+        assert result.exit_code == 0
+        with open(filename) as f:
+            exported = json.load(f)
+        assert sorted(p["name"] for p in exported["policy"]) == ["hide_welcome", "user-UI-TOTP"]
+        result = runner.invoke(edumfa_manage, ["policy", "import", "-c", "-f", filename])
+        assert result.exit_code == 0
+        assert "Added policy hide_welcome with result" in result.output
+        assert len(Policy.query.all()) == 2
+        os.remove(filename)